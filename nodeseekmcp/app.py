@@ -10,8 +10,11 @@ from fastapi.templating import Jinja2Templates
 
 from nodeseekmcp import __version__
 from nodeseekmcp.mcp_server import mcp
+from nodeseekmcp.middlewares import CompressionMiddleware
+from nodeseekmcp.profiling import add_profiler_middleware_from_env
 
-mcp_app = mcp.http_app(path='/nodeseek', transport='streamable-http', stateless_http=True)
+# json_response=True：无状态模式下直接返回完整JSON而不是SSE，便于压缩
+mcp_app = mcp.http_app(path='/nodeseek', transport='streamable-http', stateless_http=True, json_response=True)
 
 app = FastAPI(
     title='server',
@@ -21,7 +24,9 @@ app = FastAPI(
 
 templates = Jinja2Templates(directory=Path(__file__).parent / 'templates')
 
-app.mount('/mcp', mcp_app)
+app.mount('/mcp', CompressionMiddleware(mcp_app))
+
+add_profiler_middleware_from_env(app)
 
 
 @app.get('/health_check')
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import os
+import time
+from datetime import datetime
+from datetime import timedelta
+from typing import Self
+
+import pendulum
+
+from nodeseekmcp.models import RssPostHistory
+
+# 0表示关闭内存热窗口，所有查询直接走SQLite
+HOT_WINDOW_DAYS_ENV = 'NODESEEK_HOT_WINDOW_DAYS'
+
+DEFAULT_HOT_WINDOW_DAYS = 3
+
+# 两次检查写入代数之间的最小间隔（秒），避免每个请求都查一次数据库
+DEFAULT_REFRESH_INTERVAL = 1.0
+
+
+class HotPost:
+    __slots__ = ('post_id', 'url', 'author', 'title', 'tag', 'summary', 'published_at')
+
+    def __init__(
+        self,
+        post_id: str,
+        url: str,
+        author: str,
+        title: str,
+        tag: str,
+        summary: str,
+        published_at: datetime,
+    ):
+        self.post_id = post_id
+        self.url = url
+        self.author = author
+        self.title = title
+        self.tag = tag
+        self.summary = summary
+        self.published_at = published_at
+
+
+class HotWindowIndex:
+    """每个web进程在内存里保留最近N天的帖子，按published_at升序存放，用bisect做时间范围查询
+
+    写入代数（RssPostHistory.get_generation）变化时，只增量拉取created_at大于高水位的行。
+    查询范围完全落在窗口内时直接由内存返回，总数也是精确的；否则返回None，由调用方回退到SQLite。
+    """
+
+    def __init__(self, days: float = DEFAULT_HOT_WINDOW_DAYS, refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
+        self.days = days
+        self.refresh_interval = refresh_interval
+
+        self.window_start: datetime | None = None
+        self.generation: datetime | None = None
+        self.high_water_mark: datetime | None = None
+        self.post_map: dict[str, HotPost] = {}
+        self.posts: list[HotPost] = []
+        self.timestamps: list[float] = []
+
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> Self:
+        return cls(days=float(os.environ.get(HOT_WINDOW_DAYS_ENV, DEFAULT_HOT_WINDOW_DAYS)))
+
+    @property
+    def enabled(self) -> bool:
+        return self.days > 0
+
+    async def refresh(self):
+        if time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.refresh_interval:
+                return
+
+            generation = await RssPostHistory.get_generation()
+            window_start = pendulum.now('UTC') - timedelta(days=self.days)
+            rows = []
+            if generation != self.generation or self.window_start is None:
+                # 首次加载时高水位为空，会把整个窗口读进来
+                rows = await RssPostHistory.get_rows_created_after(
+                    created_after=self.high_water_mark,
+                    published_after=self.window_start or window_start,
+                )
+                for row in rows:
+                    self.post_map[row.post_id] = HotPost(
+                        post_id=row.post_id,
+                        url=row.url,
+                        author=row.author,
+                        title=row.title,
+                        tag=row.tag,
+                        summary=row.summary,
+                        published_at=row.published_at,
+                    )
+                    if self.high_water_mark is None or row.created_at > self.high_water_mark:
+                        self.high_water_mark = row.created_at
+                self.generation = generation
+
+            if rows:
+                self.post_map = {
+                    post_id: post for post_id, post in self.post_map.items() if post.published_at >= window_start
+                }
+                self.posts = sorted(self.post_map.values(), key=lambda post: post.published_at)
+                self.timestamps = [post.published_at.timestamp() for post in self.posts]
+            else:
+                # 没有新数据时只需随时间淘汰窗口头部过期的帖子
+                expired = bisect.bisect_left(self.timestamps, window_start.timestamp())
+                for post in self.posts[:expired]:
+                    del self.post_map[post.post_id]
+                del self.posts[:expired]
+                del self.timestamps[:expired]
+            self.window_start = window_start
+            self._checked_at = time.monotonic()
+
+    async def get_list_by_page(
+        self,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+        page: int = 1,
+        page_size: int = 20,
+    ) -> tuple[list[HotPost], int] | None:
+        if not self.enabled or start_time is None:
+            return None
+
+        await self.refresh()
+        if self.window_start is None or start_time < self.window_start:
+            return None
+
+        lo = bisect.bisect_left(self.timestamps, start_time.timestamp())
+        hi = len(self.timestamps) if end_time is None else bisect.bisect_left(self.timestamps, end_time.timestamp())
+        total_count = max(0, hi - lo)
+
+        # 与RssPostHistory.get_list_by_page一致：按published_at倒序分页
+        stop = hi - (page - 1) * page_size
+        start = max(lo, stop - page_size)
+        posts = self.posts[start:stop][::-1] if stop > lo else []
+        return posts, total_count
+
+
+hot_window_index = HotWindowIndex.from_env()
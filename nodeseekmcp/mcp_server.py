@@ -1,15 +1,35 @@
 from __future__ import annotations
 
 import asyncio
+from datetime import datetime
 from typing import Annotated
+from typing import Any
 
 import pendulum
+import sqlalchemy as sa
 from fastmcp import FastMCP
 from pydantic import BaseModel
 from pydantic import Field
+from pydantic import WithJsonSchema
+from pydantic import create_model
+from pydantic import model_serializer
 
+from nodeseekmcp.hot_window import hot_window_index
 from nodeseekmcp.models import RssPostHistory
+from nodeseekmcp.models import RssPostSignature
+from nodeseekmcp.models import RssPostSignatureBucket
+from nodeseekmcp.models import Watchlist
+from nodeseekmcp.models import WatchlistMatch
+from nodeseekmcp.models import create_session
 from nodeseekmcp.nodeseek import RssPost
+from nodeseekmcp.similarity import collapse_duplicate_posts
+from nodeseekmcp.similarity import get_buckets
+from nodeseekmcp.similarity import get_signature_map
+from nodeseekmcp.similarity import get_similarity
+from nodeseekmcp.watchlist import normalize_author
+from nodeseekmcp.watchlist import normalize_keyword
+from nodeseekmcp.watchlist import normalize_tag
+from nodeseekmcp.watchlist import split_terms
 
 mcp = FastMCP('NodeSeek MCP Server')
 
@@ -19,9 +39,132 @@ class BaseResponse(BaseModel):
     error: str = Field(default='', description='错误信息，调用成功时为空')
 
 
+RSS_POST_FIELDS = list(RssPost.model_fields)
+
+
+# 与RssPost字段、描述和示例一致，但全部可选，用于按fields投影
+ProjectedRssPost = create_model(
+    'ProjectedRssPost',
+    **{
+        name: (field.annotation | None, Field(default=None, description=field.description, examples=field.examples))
+        for name, field in RssPost.model_fields.items()
+    },
+)
+
+# 帖子数据直接用只含选中字段的dict，避免逐个构造模型；输出schema仍使用ProjectedRssPost
+ProjectedRssPostDict = Annotated[dict[str, Any], WithJsonSchema(ProjectedRssPost.model_json_schema())]
+
+
 class GetRssPostHistoryResponse(BaseResponse):
-    rss_posts: list[RssPost] = Field(default_factory=list, description='RSS帖子列表')
+    rss_posts: list[ProjectedRssPostDict] = Field(
+        default_factory=list,
+        description='RSS帖子列表，每个帖子只包含fields指定的字段，compact模式下不返回',
+    )
+    columns: list[str] = Field(
+        default_factory=list,
+        description='compact模式下的列名，与rows中每行的值一一对应，非compact模式下不返回',
+    )
+    rows: list[list[Any]] = Field(
+        default_factory=list,
+        description='compact模式下的帖子数据，每行一个帖子，非compact模式下不返回',
+    )
     total_count: int = Field(default=0, description='帖子总数')
+    collapsed_count: int = Field(default=0, description='collapse_duplicates为True时，本页被折叠的近似重复帖子数量')
+
+    @model_serializer(mode='plain')
+    def _serialize_current_mode(self):
+        # 只输出当前返回模式的数据字段，另一种模式的空字段不出现在结果里；
+        # 用plain而不是wrap，避免先完整序列化一遍再删除字段
+        data = {'success': self.success, 'error': self.error}
+        for key in ('rss_posts', 'columns', 'rows'):
+            if key in self.model_fields_set:
+                data[key] = getattr(self, key)
+        data['total_count'] = self.total_count
+        data['collapsed_count'] = self.collapsed_count
+        return data
+
+
+class SimilarRssPost(RssPost):
+    similarity: float = Field(description='与目标帖子的估算相似度（Jaccard），范围0~1')
+
+
+class GetSimilarPostsResponse(BaseResponse):
+    rss_posts: list[SimilarRssPost] = Field(default_factory=list, description='相似帖子列表，按相似度从高到低排列')
+
+
+class WatchlistInfo(BaseModel):
+    name: str = Field(description='监控列表名称')
+    keywords: list[str] = Field(default_factory=list, description='关键词，命中标题或摘要中任意一个即可')
+    tags: list[str] = Field(default_factory=list, description='标签，命中任意一个即可')
+    authors: list[str] = Field(default_factory=list, description='作者，命中任意一个即可')
+
+
+class GetWatchlistsResponse(BaseResponse):
+    watchlists: list[WatchlistInfo] = Field(default_factory=list, description='监控列表')
+
+
+class WatchlistMatchInfo(BaseModel):
+    watchlist_name: str = Field(description='命中的监控列表名称')
+    matched_terms: list[str] = Field(default_factory=list, description='命中的关键词、标签和作者')
+    matched_at: datetime = Field(description='命中时间')
+    rss_post: RssPost = Field(description='命中的帖子')
+
+
+class GetWatchlistMatchesResponse(BaseResponse):
+    matches: list[WatchlistMatchInfo] = Field(default_factory=list, description='命中记录，按命中时间从早到晚排列')
+    next_cursor: str = Field(
+        default='',
+        description='下一次查询使用的游标，没有新的命中记录时与传入的游标相同',
+    )
+
+
+def parse_fields(fields: str) -> list[str]:
+    if not fields.strip():
+        return RSS_POST_FIELDS
+    selected = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in selected if field not in RSS_POST_FIELDS]
+    if unknown:
+        raise ValueError(f'未知字段：{", ".join(unknown)}，可选字段：{", ".join(RSS_POST_FIELDS)}')
+    # 去重并保持RssPost中的字段顺序
+    return [field for field in RSS_POST_FIELDS if field in selected]
+
+
+def truncate(text: str, max_chars: int) -> str:
+    # 截断后的结果（含末尾的...）不超过max_chars个字符
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    if max_chars <= 3:
+        return text[:max_chars]
+    return text[: max_chars - 3] + '...'
+
+
+def build_rss_post_history_response(
+    rss_posts: list,
+    total_count: int,
+    columns: list[str],
+    summary_max_chars: int = 0,
+    compact: bool = False,
+    collapsed_count: int = 0,
+) -> GetRssPostHistoryResponse:
+    rows = [
+        [
+            truncate(post.summary, summary_max_chars) if column == 'summary' else getattr(post, column)
+            for column in columns
+        ]
+        for post in rss_posts
+    ]
+    if compact:
+        return GetRssPostHistoryResponse(
+            columns=columns,
+            rows=rows,
+            total_count=total_count,
+            collapsed_count=collapsed_count,
+        )
+    return GetRssPostHistoryResponse(
+        rss_posts=[dict(zip(columns, row)) for row in rows],
+        total_count=total_count,
+        collapsed_count=collapsed_count,
+    )
 
 
 @mcp.tool(
@@ -54,34 +197,262 @@ async def get_rss_posts(
             description='每页帖子数量，默认为20，最小1，最大100',
         ),
     ],
+    fields: Annotated[
+        str,
+        Field(
+            default='',
+            alias='fields',
+            description=f'返回的帖子字段，英文逗号分隔，为空则返回全部字段。可选：{", ".join(RSS_POST_FIELDS)}',
+        ),
+    ],
+    summary_max_chars: Annotated[
+        int,
+        Field(
+            default=0,
+            alias='summary_max_chars',
+            description='帖子摘要最大字符数，超出时截断并以...结尾（含...不超过该长度），默认为0表示不截断',
+        ),
+    ],
+    compact: Annotated[
+        bool,
+        Field(
+            default=False,
+            alias='compact',
+            description='是否使用紧凑的列式结构返回，为True时帖子数据放在columns和rows中，不返回rss_posts',
+        ),
+    ],
+    collapse_duplicates: Annotated[
+        bool,
+        Field(
+            default=False,
+            alias='collapse_duplicates',
+            description='是否折叠本页内标题和摘要近似重复的帖子（如重复发布的交易、推广帖），只保留最新的一个',
+        ),
+    ],
 ) -> GetRssPostHistoryResponse:
     timezone = 'Asia/Shanghai'
     try:
+        columns = parse_fields(fields)
         start_time = pendulum.parse(start_time, tz=timezone) if start_time else None
         end_time = pendulum.parse(end_time, tz=timezone) if end_time else None
-        rss_posts, total_count = await RssPostHistory.get_list_by_page(
+        page = max(1, page)
+        page_size = min(100, max(1, page_size))
+        # 最近几天的查询由内存热窗口直接返回，超出窗口的再查SQLite
+        result = await hot_window_index.get_list_by_page(
             start_time=start_time,
             end_time=end_time,
-            page=max(1, page),
-            page_size=min(100, max(1, page_size)),
+            page=page,
+            page_size=page_size,
         )
-        return GetRssPostHistoryResponse(
+        if result is None:
+            result = await RssPostHistory.get_list_by_page(
+                start_time=start_time,
+                end_time=end_time,
+                page=page,
+                page_size=page_size,
+            )
+        rss_posts, total_count = result
+        collapsed_count = 0
+        if collapse_duplicates:
+            rss_posts, collapsed_count = await collapse_duplicate_posts(rss_posts)
+        return build_rss_post_history_response(
+            rss_posts,
+            total_count,
+            columns,
+            summary_max_chars=summary_max_chars,
+            compact=compact,
+            collapsed_count=collapsed_count,
+        )
+    except Exception as e:
+        return GetRssPostHistoryResponse(error=str(e), success=False)
+
+
+@mcp.tool(
+    name='get_nodeseek_similar_posts',
+    description='查询与指定帖子标题和摘要相似的“NodeSeek论坛”或“NS论坛”帖子，可用于发现重复发布的帖子',
+)
+async def get_similar_posts(
+    post_id: Annotated[str, Field(alias='post_id', description='帖子ID，例如419416')],
+    min_similarity: Annotated[
+        float,
+        Field(default=0.5, alias='min_similarity', description='最小相似度，默认为0.5，范围0~1'),
+    ],
+    limit: Annotated[int, Field(default=20, alias='limit', description='返回数量，默认为20，最小1，最大100')],
+) -> GetSimilarPostsResponse:
+    try:
+        posts = await RssPostHistory.get_list(RssPostHistory.post_id == post_id, limit=1)
+        if not posts:
+            raise ValueError(f'帖子不存在：{post_id}')
+        post = posts[0]
+        # 目标帖子尚未回填签名时在线程里现场计算
+        signature = (await get_signature_map([post]))[post_id]
+
+        # 只比较与目标帖子落在同一个LSH桶里的候选帖子，避免与全部历史帖子逐一比较
+        candidate_post_ids = await RssPostSignatureBucket.get_candidate_post_ids(
+            get_buckets(signature),
+            exclude_post_id=post_id,
+        )
+        candidate_signature_map = await RssPostSignature.get_signature_map(candidate_post_ids)
+        similarity_map = {
+            candidate_post_id: similarity
+            for candidate_post_id, candidate_signature in candidate_signature_map.items()
+            if (similarity := get_similarity(signature, candidate_signature)) >= min_similarity
+        }
+        similar_post_ids = sorted(similarity_map, key=similarity_map.get, reverse=True)[: min(100, max(1, limit))]
+        similar_posts = await RssPostHistory.get_list(RssPostHistory.post_id.in_(similar_post_ids))
+        similar_posts.sort(key=lambda similar_post: (-similarity_map[similar_post.post_id], similar_post.post_id))
+        return GetSimilarPostsResponse(
             rss_posts=[
-                RssPost(
-                    post_id=post.post_id,
-                    url=post.url,
-                    author=post.author,
-                    title=post.title,
-                    tag=post.tag,
-                    summary=post.summary,
-                    published_at=post.published_at,
+                SimilarRssPost(
+                    post_id=similar_post.post_id,
+                    url=similar_post.url,
+                    author=similar_post.author,
+                    title=similar_post.title,
+                    tag=similar_post.tag,
+                    summary=similar_post.summary,
+                    published_at=similar_post.published_at,
+                    similarity=similarity_map[similar_post.post_id],
                 )
-                for post in rss_posts
+                for similar_post in similar_posts
             ],
-            total_count=total_count,
         )
     except Exception as e:
-        return GetRssPostHistoryResponse(error=str(e), success=False)
+        return GetSimilarPostsResponse(error=str(e), success=False)
+
+
+@mcp.tool(
+    name='add_or_update_nodeseek_watchlist',
+    description=(
+        '新增或更新“NodeSeek论坛”或“NS论坛”的帖子监控列表（按名称覆盖）。'
+        '新帖子入库时会自动匹配：关键词、标签、作者三类条件之间为“且”，同一类条件内为“或”，为空的条件不限制'
+    ),
+)
+async def add_or_update_watchlist(
+    name: Annotated[str, Field(alias='name', description='监控列表名称，唯一，最长64个字符')],
+    keywords: Annotated[
+        str,
+        Field(default='', alias='keywords', description='关键词，英文逗号分隔，匹配帖子标题和摘要，不区分大小写'),
+    ],
+    tags: Annotated[
+        str,
+        Field(default='', alias='tags', description='标签，英文逗号分隔，例如：交易,推广'),
+    ],
+    authors: Annotated[
+        str,
+        Field(default='', alias='authors', description='作者，英文逗号分隔'),
+    ],
+) -> GetWatchlistsResponse:
+    try:
+        name = name.strip()
+        if not name or len(name) > 64:
+            raise ValueError('监控列表名称不能为空，且最长64个字符')
+        keywords = split_terms(keywords, normalize_keyword)
+        tags = split_terms(tags, normalize_tag)
+        authors = split_terms(authors, normalize_author)
+        if not (keywords or tags or authors):
+            raise ValueError('关键词、标签、作者至少需要填写一项')
+
+        async with create_session() as session:
+            watchlist = await session.scalar(Watchlist.build_query(Watchlist.name == name))
+            if watchlist is None:
+                watchlist = Watchlist(name=name)
+                session.add(watchlist)
+            watchlist.keywords = keywords
+            watchlist.tags = tags
+            watchlist.authors = authors
+            await session.commit()
+
+        return GetWatchlistsResponse(
+            watchlists=[WatchlistInfo(name=name, keywords=keywords, tags=tags, authors=authors)],
+        )
+    except Exception as e:
+        return GetWatchlistsResponse(error=str(e), success=False)
+
+
+@mcp.tool(
+    name='get_nodeseek_watchlists',
+    description='查询“NodeSeek论坛”或“NS论坛”的所有帖子监控列表',
+)
+async def get_watchlists() -> GetWatchlistsResponse:
+    try:
+        watchlists = await Watchlist.get_list(order_by=[Watchlist.name])
+        return GetWatchlistsResponse(
+            watchlists=[
+                WatchlistInfo(
+                    name=watchlist.name,
+                    keywords=watchlist.keywords,
+                    tags=watchlist.tags,
+                    authors=watchlist.authors,
+                )
+                for watchlist in watchlists
+            ],
+        )
+    except Exception as e:
+        return GetWatchlistsResponse(error=str(e), success=False)
+
+
+@mcp.tool(
+    name='delete_nodeseek_watchlist',
+    description='删除“NodeSeek论坛”或“NS论坛”的帖子监控列表及其命中记录',
+)
+async def delete_watchlist(
+    name: Annotated[str, Field(alias='name', description='监控列表名称')],
+) -> BaseResponse:
+    try:
+        async with create_session() as session:
+            await session.execute(sa.delete(WatchlistMatch).where(WatchlistMatch.watchlist_name == name))
+            result = await session.execute(sa.delete(Watchlist).where(Watchlist.name == name))
+            if not result.rowcount:
+                raise ValueError(f'监控列表不存在：{name}')
+            await session.commit()
+        return BaseResponse()
+    except Exception as e:
+        return BaseResponse(error=str(e), success=False)
+
+
+@mcp.tool(
+    name='get_nodeseek_watchlist_matches',
+    description='查询游标之后“NodeSeek论坛”或“NS论坛”帖子监控列表的新命中记录，返回命中记录和下一次查询使用的游标',
+)
+async def get_watchlist_matches(
+    cursor: Annotated[
+        str,
+        Field(default='', alias='cursor', description='上一次查询返回的next_cursor，为空则从最早的命中记录开始'),
+    ],
+    watchlist_name: Annotated[
+        str,
+        Field(default='', alias='watchlist_name', description='监控列表名称，为空则查询所有监控列表'),
+    ],
+    limit: Annotated[int, Field(default=20, alias='limit', description='返回数量，默认为20，最小1，最大100')],
+) -> GetWatchlistMatchesResponse:
+    try:
+        matches = await WatchlistMatch.get_list_since(
+            cursor=cursor,
+            watchlist_name=watchlist_name,
+            limit=min(100, max(1, limit)),
+        )
+        return GetWatchlistMatchesResponse(
+            matches=[
+                WatchlistMatchInfo(
+                    watchlist_name=match.watchlist_name,
+                    matched_terms=match.matched_terms,
+                    matched_at=match.created_at,
+                    rss_post=RssPost(
+                        post_id=post.post_id,
+                        url=post.url,
+                        author=post.author,
+                        title=post.title,
+                        tag=post.tag,
+                        summary=post.summary,
+                        published_at=post.published_at,
+                    ),
+                )
+                for match, post in matches
+            ],
+            next_cursor=WatchlistMatch.encode_cursor(matches[-1][0]) if matches else cursor,
+        )
+    except Exception as e:
+        return GetWatchlistMatchesResponse(error=str(e), success=False)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import gzip
+
+import brotli
+from starlette.datastructures import Headers
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+DEFAULT_MINIMUM_SIZE = 512
+
+DEFAULT_COMPRESSIBLE_CONTENT_TYPES = ('application/json',)
+
+
+def parse_accept_encoding(accept_encoding: str) -> dict[str, float]:
+    encodings = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def select_encoding(accept_encoding: str) -> str | None:
+    encodings = parse_accept_encoding(accept_encoding)
+    wildcard = encodings.get('*', 0.0)
+    candidates = [(encodings.get(name, wildcard), preference, name) for preference, name in enumerate(['gzip', 'br'])]
+    q, _, name = max(candidates)
+    return name if q > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, mode=brotli.MODE_TEXT, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class CompressionMiddleware:
+    """按Accept-Encoding协商br/gzip压缩
+
+    只压缩一次性返回完整body的JSON响应；流式响应（如text/event-stream）原样透传，避免缓冲SSE
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        content_types: tuple[str, ...] = DEFAULT_COMPRESSIBLE_CONTENT_TYPES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = content_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(Headers(scope=scope).get('Accept-Encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_with_compression(message: Message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                content_type = headers.get('Content-Type', '').split(';')[0].strip().lower()
+                if 'Content-Encoding' in headers or content_type not in self.content_types:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message['type'] != 'http.response.body' or start_message is None:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            if message.get('more_body', False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers = MutableHeaders(raw=start_message['headers'])
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(body))
+            headers.add_vary_header('Accept-Encoding')
+            await send(start_message)
+            await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+        await self.app(scope, receive, send_with_compression)
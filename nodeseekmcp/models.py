@@ -16,7 +16,9 @@ import sqlalchemy as sa
 from sqlalchemy import Select
 from sqlalchemy import String
 from sqlalchemy import Text
+from sqlalchemy import and_
 from sqlalchemy import func
+from sqlalchemy import or_
 from sqlalchemy import select
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.dialects import sqlite
@@ -36,10 +38,16 @@ from sqlalchemy.types import CHAR
 from sqlalchemy.types import TypeDecorator
 from sqlalchemy.types import TypeEngine
 
+from nodeseekmcp.profiling import install_query_timer_from_env
+from nodeseekmcp.profiling import install_slow_query_log_from_env
+
 SQLALCHEMY_DATABASE_URI = 'sqlite+aiosqlite:///db.sqlite3'
 
 engine = create_async_engine(SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
 
+install_query_timer_from_env(engine)
+install_slow_query_log_from_env(engine)
+
 session_function = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 Session = async_scoped_session(session_function, scopefunc=asyncio.current_task)
@@ -64,8 +72,15 @@ async def create_tables():
             BaseModel.metadata.create_all,
             tables=[
                 RssPostHistory.__table__,
+                RssPostSignature.__table__,
+                RssPostSignatureBucket.__table__,
+                Watchlist.__table__,
+                WatchlistMatch.__table__,
             ],
         )
+        # create_all不会给已存在的表补建后来新增的索引
+        for index in RssPostHistory.__table__.indexes:
+            await conn.run_sync(index.create, checkfirst=True)
 
 
 async def drop_tables():
@@ -74,6 +89,10 @@ async def drop_tables():
             BaseModel.metadata.drop_all,
             tables=[
                 RssPostHistory.__table__,
+                RssPostSignature.__table__,
+                RssPostSignatureBucket.__table__,
+                Watchlist.__table__,
+                WatchlistMatch.__table__,
             ],
         )
 
@@ -294,6 +313,7 @@ class BaseModel(DeclarativeBase):
 
 class RssPostHistory(BaseModel):
     __tablename__ = 'rss_post_history'
+    __table_args__ = (sa.Index('ix_rss_post_history_created_at', 'created_at'),)
     post_id: Mapped[str] = mapped_column(String(32), nullable=False, index=True, unique=True)
     url: Mapped[str] = mapped_column(String(256), nullable=False, index=True, unique=True)
     author: Mapped[str] = mapped_column(String(128), nullable=False)
@@ -334,3 +354,161 @@ class RssPostHistory(BaseModel):
                 session=session,
             )
             return posts, total_count
+
+    @classmethod
+    async def get_generation(cls, session: AsyncSession = None) -> datetime | None:
+        # 定时任务每次写入都会刷新created_at，最大值变化即表示有新的写入
+        async with session or Session() as session:
+            return await session.scalar(select(func.max(cls.created_at)))
+
+    @classmethod
+    async def get_rows_created_after(
+        cls,
+        created_after: datetime | None,
+        published_after: datetime,
+        session: AsyncSession = None,
+    ) -> list[sa.Row]:
+        # 只查需要的列，跳过ORM对象的构建
+        where = [cls.published_at >= published_after]
+        if created_after:
+            where.append(cls.created_at > created_after)
+        query = select(
+            cls.post_id,
+            cls.url,
+            cls.author,
+            cls.title,
+            cls.tag,
+            cls.summary,
+            cls.published_at,
+            cls.created_at,
+        ).where(*where)
+        async with session or Session() as session:
+            result = await session.execute(query)
+            return list(result)
+
+    @classmethod
+    async def get_text_map(cls, post_ids: list[str], session: AsyncSession = None) -> dict[str, tuple[str, str]]:
+        """已入库帖子的(title, summary)，用于区分新帖子和内容被修改过的帖子"""
+        if not post_ids:
+            return {}
+        async with session or Session() as session:
+            result = await session.execute(
+                select(cls.post_id, cls.title, cls.summary).where(cls.post_id.in_(post_ids)),
+            )
+            return {post_id: (title, summary) for post_id, title, summary in result}
+
+    @classmethod
+    async def get_list_without_signature(cls, limit: int = 100, session: AsyncSession = None) -> list[Self]:
+        return await cls.get_list(
+            cls.post_id.not_in(select(RssPostSignature.post_id)),
+            order_by=[cls.published_at.desc()],
+            limit=limit,
+            session=session,
+        )
+
+
+class RssPostSignature(BaseModel):
+    __tablename__ = 'rss_post_signature'
+    post_id: Mapped[str] = mapped_column(String(32), nullable=False, index=True, unique=True)
+    signature: Mapped[list[int]] = mapped_column(sa.JSON, nullable=False)
+
+    @classmethod
+    async def get_signature_map(cls, post_ids: list[str], session: AsyncSession = None) -> dict[str, list[int]]:
+        if not post_ids:
+            return {}
+        async with session or Session() as session:
+            result = await session.execute(select(cls.post_id, cls.signature).where(cls.post_id.in_(post_ids)))
+            return {post_id: signature for post_id, signature in result}
+
+
+class RssPostSignatureBucket(BaseModel):
+    __tablename__ = 'rss_post_signature_bucket'
+    __table_args__ = (sa.UniqueConstraint('bucket', 'post_id'),)
+    bucket: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    post_id: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+
+    @classmethod
+    async def get_candidate_post_ids(
+        cls,
+        buckets: list[str],
+        exclude_post_id: str = '',
+        limit: int = 1000,
+        session: AsyncSession = None,
+    ) -> list[str]:
+        # 按共享桶数量从多到少取候选，热门桶再大也只取前limit个
+        query = (
+            select(cls.post_id)
+            .where(cls.bucket.in_(buckets), cls.post_id != exclude_post_id)
+            .group_by(cls.post_id)
+            .order_by(func.count().desc())
+            .limit(limit)
+        )
+        async with session or Session() as session:
+            result = await session.scalars(query)
+            return list(result)
+
+
+class Watchlist(BaseModel):
+    __tablename__ = 'watchlist'
+    name: Mapped[str] = mapped_column(String(64), nullable=False, index=True, unique=True)
+    keywords: Mapped[list[str]] = mapped_column(sa.JSON, nullable=False, default=list)
+    tags: Mapped[list[str]] = mapped_column(sa.JSON, nullable=False, default=list)
+    authors: Mapped[list[str]] = mapped_column(sa.JSON, nullable=False, default=list)
+
+    @classmethod
+    async def get_version(cls, session: AsyncSession = None) -> tuple[int, datetime | None]:
+        # 监控列表的增删改都会改变(数量, 最大更新时间)，用来判断匹配器是否需要重建
+        async with session or Session() as session:
+            result = await session.execute(select(func.count(cls.id), func.max(cls.updated_at)))
+            for count, updated_at in result:
+                return count, updated_at
+        return 0, None
+
+
+class WatchlistMatch(BaseModel):
+    __tablename__ = 'watchlist_match'
+    __table_args__ = (
+        sa.UniqueConstraint('watchlist_id', 'post_id'),
+        sa.Index('ix_watchlist_match_cursor', 'created_at', 'id'),
+    )
+    watchlist_id: Mapped[uuid.UUID] = mapped_column(UUID(), nullable=False, index=True)
+    watchlist_name: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    post_id: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    matched_terms: Mapped[list[str]] = mapped_column(sa.JSON, nullable=False, default=list)
+
+    @classmethod
+    def encode_cursor(cls, match: Self) -> str:
+        return f'{match.created_at.isoformat()}|{match.id}'
+
+    @classmethod
+    def decode_cursor(cls, cursor: str) -> tuple[datetime, uuid.UUID]:
+        created_at, _, match_id = cursor.partition('|')
+        return pendulum.parse(created_at), uuid.UUID(match_id)
+
+    @classmethod
+    async def get_list_since(
+        cls,
+        cursor: str = '',
+        watchlist_name: str = '',
+        limit: int = 20,
+        session: AsyncSession = None,
+    ) -> list[tuple[Self, RssPostHistory]]:
+        query = (
+            select(cls, RssPostHistory)
+            .join(RssPostHistory, RssPostHistory.post_id == cls.post_id)
+            .order_by(cls.created_at, cls.id)
+            .limit(limit)
+        )
+        if cursor:
+            created_at, match_id = cls.decode_cursor(cursor)
+            query = query.where(
+                or_(
+                    cls.created_at > created_at,
+                    and_(cls.created_at == created_at, cls.id > match_id),
+                )
+            )
+        if watchlist_name:
+            query = query.where(cls.watchlist_name == watchlist_name)
+        async with session or Session() as session:
+            result = await session.execute(query)
+            return [(match, post) for match, post in result]
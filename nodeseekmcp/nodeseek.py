@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 from datetime import datetime
 from typing import Self
 
@@ -13,6 +15,9 @@ from pydantic import Field
 
 DEFAULT_RSS_URL = 'https://rss.nodeseek.com'
 
+# 多个RSS源用英文逗号分隔，例如分类RSS或镜像RSS
+RSS_URLS_ENV = 'NODESEEK_RSS_URLS'
+
 DEFAULT_BASE_URL = 'https://www.nodeseek.com'
 
 DEFAULT_BASE_API_URL = 'https://api.nodeseek.com'
@@ -21,6 +26,13 @@ DEFAULT_USER_AGENT = 'Mozilla/5.0 (X11; Linux i686; rv:95.0) Gecko/20100101 Fire
 
 DEFAULT_TIMEOUT = 10.24
 
+# 定时任务每10秒拉取一次且所有源拉取完才统一写库，单个源的超时必须明显小于调度间隔
+RSS_FEED_TIMEOUT_ENV = 'NODESEEK_RSS_FEED_TIMEOUT'
+
+DEFAULT_RSS_FEED_TIMEOUT = 3.0
+
+DEFAULT_MAX_CONNECTIONS = 16
+
 TAG_ZH_MAP = {
     'daily': '日常',
     'tech': '技术',
@@ -55,27 +67,41 @@ class RssPost(BaseModel):
     published_at: datetime = Field(description='帖子发布时间', examples=['2025-08-10T16:49:46+00:00'])
 
 
+class RssFeedState(BaseModel):
+    etag: str = Field(default='', description='上次响应的ETag，用于If-None-Match')
+    last_modified: str = Field(default='', description='上次响应的Last-Modified，用于If-Modified-Since')
+
+
 class NodeSeekClient:
     def __init__(
         self,
         base_url: str = DEFAULT_BASE_URL,
         rss_url: str = DEFAULT_RSS_URL,
+        rss_urls: list[str] | None = None,
         base_api_url: str = DEFAULT_BASE_API_URL,
         user_agent: str = DEFAULT_USER_AGENT,
         timeout: float = DEFAULT_TIMEOUT,
+        rss_feed_timeout: float = DEFAULT_RSS_FEED_TIMEOUT,
         logger: logging.Logger | None = None,
     ):
         self.base_url = base_url.rstrip('/')
         self.rss_url = rss_url.rstrip('/')
+        self.rss_urls = [url.rstrip('/') for url in rss_urls or [rss_url]]
         self.base_api_url = base_api_url.rstrip('/')
 
         self.user_agent = user_agent
         self.timeout = timeout
+        self.rss_feed_timeout = rss_feed_timeout
         self.logger = logger or logging.getLogger(__name__)
 
+        self.rss_feed_states: dict[str, RssFeedState] = {}
+        self._async_http_client: httpx.AsyncClient | None = None
+
     @classmethod
     def from_env(cls, logger: logging.Logger | None = None) -> Self:
-        return cls(logger=logger)
+        rss_urls = [url.strip() for url in os.environ.get(RSS_URLS_ENV, '').split(',') if url.strip()]
+        rss_feed_timeout = float(os.environ.get(RSS_FEED_TIMEOUT_ENV) or DEFAULT_RSS_FEED_TIMEOUT)
+        return cls(rss_urls=rss_urls or None, rss_feed_timeout=rss_feed_timeout, logger=logger)
 
     def _get_headers(self) -> dict:
         return {
@@ -94,8 +120,30 @@ class NodeSeekClient:
             raise ValueError(f'Request failed status_code={response.status_code}, body={response.text}')
         return response.text
 
-    def get_rss_posts(self) -> list[RssPost]:
-        content = self._request('GET', self.rss_url)
+    def _get_async_http_client(self) -> httpx.AsyncClient:
+        if self._async_http_client is None or self._async_http_client.is_closed:
+            self._async_http_client = httpx.AsyncClient(
+                headers=self._get_headers(),
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=DEFAULT_MAX_CONNECTIONS,
+                    max_keepalive_connections=DEFAULT_MAX_CONNECTIONS,
+                ),
+                follow_redirects=True,
+            )
+        return self._async_http_client
+
+    async def aclose(self):
+        if self._async_http_client is not None:
+            await self._async_http_client.aclose()
+            self._async_http_client = None
+
+    def reset_rss_feed_states(self):
+        # 丢弃条件请求状态，下次强制全量拉取，用于写库失败后避免因304漏帖
+        self.rss_feed_states.clear()
+
+    @classmethod
+    def parse_rss_posts(cls, content: str) -> list[RssPost]:
         result = feedparser.parse(content)
         rss_posts = []
         for entry in result['entries']:
@@ -116,6 +164,54 @@ class NodeSeekClient:
             rss_posts.append(rss_post)
         return rss_posts
 
+    def get_rss_posts(self) -> list[RssPost]:
+        content = self._request('GET', self.rss_url)
+        return self.parse_rss_posts(content)
+
+    async def _get_rss_feed_posts(self, rss_url: str) -> list[RssPost]:
+        state = self.rss_feed_states.get(rss_url) or RssFeedState()
+        headers = {}
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+
+        response = await self._get_async_http_client().get(rss_url, headers=headers)
+        if response.status_code == 304:
+            return []
+        if response.status_code != 200:
+            raise ValueError(f'Request failed status_code={response.status_code}, body={response.text}')
+
+        # feedparser是纯CPU解析，放到线程里避免阻塞其他RSS源的请求
+        rss_posts = await asyncio.to_thread(self.parse_rss_posts, response.text)
+        self.rss_feed_states[rss_url] = RssFeedState(
+            etag=response.headers.get('ETag', ''),
+            last_modified=response.headers.get('Last-Modified', ''),
+        )
+        return rss_posts
+
+    async def get_rss_posts_from_feeds(
+        self,
+        rss_urls: list[str] | None = None,
+        feed_timeout: float | None = None,
+    ) -> list[RssPost]:
+        """并发拉取多个RSS源，单个源超时或失败只记录日志，不影响其他源；结果按post_id去重"""
+        rss_urls = rss_urls or self.rss_urls
+        feed_timeout = feed_timeout or self.rss_feed_timeout
+        results = await asyncio.gather(
+            *[asyncio.wait_for(self._get_rss_feed_posts(rss_url), timeout=feed_timeout) for rss_url in rss_urls],
+            return_exceptions=True,
+        )
+
+        rss_post_map: dict[str, RssPost] = {}
+        for rss_url, result in zip(rss_urls, results):
+            if isinstance(result, BaseException):
+                self.logger.warning(f'Get rss feed failed rss_url={rss_url}, error={result!r}')
+                continue
+            for rss_post in result:
+                rss_post_map.setdefault(rss_post.post_id, rss_post)
+        return list(rss_post_map.values())
+
     def get_post_detail(self, post_id: str, page: int = 1) -> str:
         url = f'{self.base_url}/post-{post_id}-{page}'
         return self._request('GET', url)
@@ -125,3 +221,6 @@ if __name__ == '__main__':
     client = NodeSeekClient()
     rss_posts = client.get_rss_posts()
     print(rss_posts)
+
+    rss_posts = asyncio.run(client.get_rss_posts_from_feeds())
+    print(rss_posts)
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+
+import sqlalchemy as sa
+from fastapi import FastAPI
+from greenlet import getcurrent
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+# 以下环境变量均未设置（或为0）时不安装任何钩子，没有额外开销
+PROFILE_SAMPLE_RATE_ENV = 'NODESEEK_PROFILE_SAMPLE_RATE'
+
+PROFILE_SLOW_MS_ENV = 'NODESEEK_PROFILE_SLOW_MS'
+
+PROFILE_DIR_ENV = 'NODESEEK_PROFILE_DIR'
+
+SLOW_QUERY_MS_ENV = 'NODESEEK_SLOW_QUERY_MS'
+
+DEFAULT_PROFILE_DIR = 'profiles'
+
+DEFAULT_SAMPLE_INTERVAL = 0.002
+
+MAX_PARAMETERS_LENGTH = 1024
+
+_UNSAFE_FILENAME_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+# 表名前可能是子查询的左括号，例如count()生成的SELECT count(*) FROM (SELECT ... FROM rss_post_history)
+_SQL_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+(\(|"?[\w.]+)', re.IGNORECASE)
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+slow_query_logger = logging.getLogger('nodeseekmcp.slow_query')
+
+# 由ProfilerMiddleware设置，SQL耗时只计入发起查询的请求，不会混入同时在处理的其他请求
+current_request_profile: ContextVar[RequestProfile | None] = ContextVar('current_request_profile', default=None)
+
+
+def get_folded_stack(frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f'{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+
+def get_query_label(statement: str) -> str:
+    words = statement.split(maxsplit=1)
+    if not words:
+        return 'UNKNOWN'
+    tables = [table.strip('"') for table in _SQL_TABLE_RE.findall(statement)]
+    if not tables:
+        return words[0].upper()
+    if tables[0] == '(':
+        return f'{words[0].upper()} (subquery {next((table for table in tables if table != "("), "?")})'
+    return f'{words[0].upper()} {tables[0]}'
+
+
+def get_caller_label() -> str:
+    """取出调用栈中本项目内的函数，例如get_rss_posts;RssPostHistory.get_list_by_page;BaseModel.count
+
+    异步引擎的cursor事件在SQLAlchemy的greenlet里执行，外层协程此时正在运行（cr_await为空），
+    它们的帧在父greenlet挂起处的调用栈上，所以要沿greenlet逐级往上找
+    """
+    names = []
+    current = getcurrent()
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(_PACKAGE_DIR) and code.co_filename != __file__:
+            names.append(code.co_qualname)
+        frame = frame.f_back
+        if frame is None and current.parent is not None:
+            current = current.parent
+            frame = current.gr_frame
+    return ';'.join(reversed(names))
+
+
+class RequestProfile:
+    """单个请求挂载到采样线程期间收集到的调用栈和数据库耗时"""
+
+    def __init__(self, thread_id: int):
+        self.thread_id = thread_id
+        self.stacks: Counter[str] = Counter()
+        self.db_ms = 0.0
+        self.db_query_count = 0
+        self.db_ms_map: Counter[str] = Counter()
+        # 正在执行的SQL数量；大于0时事件循环线程上本请求只是在等待aiosqlite工作线程，
+        # 采样线程跳过这段时间，避免与[db]栈重复计时
+        self.db_depth = 0
+
+    def get_folded_stacks(self, interval: float) -> Counter[str]:
+        # SQL在aiosqlite的工作线程里执行，事件循环线程上只能采到空闲的selector等待；
+        # 这里把实测的数据库耗时按采样间隔折算成样本数，作为独立的[db]栈与采样结果放在同一张火焰图里
+        stacks = Counter(self.stacks)
+        for label, duration_ms in self.db_ms_map.items():
+            stacks[f'[db];{label}'] += max(1, round(duration_ms / (interval * 1000)))
+        return stacks
+
+
+class StackSampler:
+    """进程内共享的常驻采样线程，结果为flamegraph折叠格式（frame1;frame2;... count）
+
+    有请求挂载时按固定间隔采样，每次采样分发给所有挂载中的请求；没有请求时阻塞等待，不占用CPU。
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.profiles: set[RequestProfile] = set()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                thread_ids = {profile.thread_id for profile in self.profiles if not profile.db_depth}
+            if not thread_ids:
+                continue
+            # 拼接调用栈比较耗时，放在锁外面做，不阻塞事件循环线程上的attach/detach
+            frames = sys._current_frames()
+            stack_map = {thread_id: get_folded_stack(frames.get(thread_id)) for thread_id in thread_ids}
+            with self._lock:
+                for profile in self.profiles:
+                    if not profile.db_depth and (stack := stack_map.get(profile.thread_id)):
+                        profile.stacks[stack] += 1
+
+    def attach(self, thread_id: int) -> RequestProfile:
+        profile = RequestProfile(thread_id)
+        with self._lock:
+            self.profiles.add(profile)
+            self._active.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='nodeseekmcp-stack-sampler', daemon=True)
+                self._thread.start()
+        return profile
+
+    def detach(self, profile: RequestProfile):
+        with self._lock:
+            self.profiles.discard(profile)
+            if not self.profiles:
+                self._active.clear()
+
+
+stack_sampler = StackSampler()
+
+
+def write_folded_stacks(path: Path, stacks: Counter[str]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(''.join(f'{stack} {count}\n' for stack, count in stacks.items()))
+
+
+class ProfilerMiddleware:
+    """按比例或按耗时阈值采样请求的调用栈，输出可直接给flamegraph.pl或speedscope使用的折叠栈文件
+
+    所有请求共用一个采样线程。采样的是事件循环线程，同时在处理的请求的CPU栈会相互混入；
+    数据库耗时由install_query_timer按请求单独记录，并按调用路径（如BaseModel.count）区分
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 0.0,
+        slow_ms: float = 0.0,
+        output_dir: str = DEFAULT_PROFILE_DIR,
+        sampler: StackSampler = stack_sampler,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.output_dir = Path(output_dir)
+        self.sampler = sampler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        sampled = random.random() < self.sample_rate
+        if not sampled and self.slow_ms <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.sampler.attach(threading.get_ident())
+        token = current_request_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request_profile.reset(token)
+            self.sampler.detach(profile)
+            duration_ms = (time.perf_counter() - start) * 1000
+            stacks = profile.get_folded_stacks(self.sampler.interval)
+            if stacks and (sampled or duration_ms >= self.slow_ms):
+                name = _UNSAFE_FILENAME_RE.sub('_', f'{scope["method"]}{scope["path"]}').strip('_')
+                filename = (
+                    f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{name}-{duration_ms:.0f}ms'
+                    f'-db{profile.db_ms:.0f}ms-{profile.db_query_count}q.folded'
+                )
+                await asyncio.to_thread(write_folded_stacks, self.output_dir / filename, stacks)
+
+
+def is_profiler_enabled_from_env() -> bool:
+    sample_rate = float(os.environ.get(PROFILE_SAMPLE_RATE_ENV) or 0)
+    slow_ms = float(os.environ.get(PROFILE_SLOW_MS_ENV) or 0)
+    return sample_rate > 0 or slow_ms > 0
+
+
+def add_profiler_middleware_from_env(app: FastAPI):
+    if not is_profiler_enabled_from_env():
+        return
+    app.add_middleware(
+        ProfilerMiddleware,
+        sample_rate=float(os.environ.get(PROFILE_SAMPLE_RATE_ENV) or 0),
+        slow_ms=float(os.environ.get(PROFILE_SLOW_MS_ENV) or 0),
+        output_dir=os.environ.get(PROFILE_DIR_ENV) or DEFAULT_PROFILE_DIR,
+    )
+
+
+def _explain(conn: sa.Connection, statement: str, parameters) -> list:
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    # 直接用底层DBAPI连接执行，不再触发本模块的事件钩子
+    explain_cursor = conn.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        return [tuple(row) for row in explain_cursor.fetchall()]
+    finally:
+        explain_cursor.close()
+
+
+def install_slow_query_log(engine: AsyncEngine, slow_ms: float):
+    """记录超过阈值的SQL：语句、参数、耗时和执行计划"""
+
+    @sa.event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    @sa.event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info['query_start_time'].pop()) * 1000
+        if duration_ms < slow_ms:
+            return
+
+        plan = []
+        if not executemany:
+            try:
+                plan = _explain(conn, statement, parameters)
+            except Exception as e:
+                plan = [f'EXPLAIN failed: {e!r}']
+        slow_query_logger.warning(
+            'slow query duration_ms=%.1f executemany=%s statement=%s parameters=%s plan=%s',
+            duration_ms,
+            executemany,
+            ' '.join(statement.split()),
+            repr(parameters)[:MAX_PARAMETERS_LENGTH],
+            plan,
+        )
+
+    @sa.event.listens_for(engine.sync_engine, 'handle_error')
+    def handle_error(context):
+        # 执行失败时不会触发after_cursor_execute，这里把对应的开始时间弹出
+        if context.connection is not None and context.connection.info.get('query_start_time'):
+            context.connection.info['query_start_time'].pop()
+
+
+def install_slow_query_log_from_env(engine: AsyncEngine):
+    slow_ms = float(os.environ.get(SLOW_QUERY_MS_ENV) or 0)
+    if slow_ms > 0:
+        install_slow_query_log(engine, slow_ms)
+
+
+def install_query_timer(engine: AsyncEngine):
+    """记录每条SQL的实测耗时（含等待aiosqlite工作线程的时间），计入发起查询的请求"""
+
+    @sa.event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = current_request_profile.get()
+        label = ''
+        if profile is not None:
+            label = f'{get_caller_label() or "?"};{get_query_label(statement)}'
+            profile.db_depth += 1
+        conn.info.setdefault('profile_queries', []).append((profile, label, time.perf_counter()))
+
+    @sa.event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile, label, start = conn.info['profile_queries'].pop()
+        if profile is None:
+            return
+        duration_ms = (time.perf_counter() - start) * 1000
+        profile.db_depth -= 1
+        profile.db_ms += duration_ms
+        profile.db_query_count += 1
+        profile.db_ms_map[label] += duration_ms
+
+    @sa.event.listens_for(engine.sync_engine, 'handle_error')
+    def handle_error(context):
+        if context.connection is not None and context.connection.info.get('profile_queries'):
+            profile, _, _ = context.connection.info['profile_queries'].pop()
+            if profile is not None:
+                profile.db_depth -= 1
+
+
+def install_query_timer_from_env(engine: AsyncEngine):
+    if is_profiler_enabled_from_env():
+        install_query_timer(engine)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import re
+from typing import Iterable
+
+from nodeseekmcp.models import RssPostHistory
+from nodeseekmcp.models import RssPostSignature
+
+# MinHash签名长度 = 分段数 * 每段行数；16段*4行时Jaccard相似度约0.5以上的帖子大概率落入同一个桶
+NUM_BANDS = 16
+
+ROWS_PER_BAND = 4
+
+NUM_PERMUTATIONS = NUM_BANDS * ROWS_PER_BAND
+
+SHINGLE_SIZE = 3
+
+DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+_rng = random.Random(20250810)
+
+# 固定种子，保证不同进程、不同版本计算出的签名一致
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1)) for _ in range(NUM_PERMUTATIONS)
+]
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def get_shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    text = _WHITESPACE_RE.sub(' ', text.lower()).strip()
+    if len(text) <= size:
+        return {text}
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def get_signature(title: str, summary: str) -> list[int]:
+    hashes = [_hash(shingle) for shingle in get_shingles(f'{title} {summary}')]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def get_buckets(signature: list[int]) -> list[str]:
+    buckets = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(','.join(map(str, rows)).encode(), digest_size=8).hexdigest()
+        buckets.append(f'{band:02d}:{digest}')
+    return buckets
+
+
+def get_similarity(signature: list[int], other: list[int]) -> float:
+    if len(signature) != len(other) or not signature:
+        return 0.0
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+
+def get_signatures(posts: Iterable[RssPostHistory]) -> dict[str, list[int]]:
+    return {post.post_id: get_signature(post.title, post.summary) for post in posts}
+
+
+async def get_signature_map(posts: Iterable[RssPostHistory]) -> dict[str, list[int]]:
+    """优先读取已入库的签名，缺失的（例如历史帖子尚未回填）现场计算"""
+    posts = list(posts)
+    signature_map = await RssPostSignature.get_signature_map([post.post_id for post in posts])
+    missing_posts = [post for post in posts if post.post_id not in signature_map]
+    if missing_posts:
+        # MinHash计算是纯CPU操作，每个帖子约10ms，放到线程里避免阻塞事件循环
+        signature_map.update(await asyncio.to_thread(get_signatures, missing_posts))
+    return signature_map
+
+
+async def collapse_duplicate_posts(
+    posts: list[RssPostHistory],
+    threshold: float = DUPLICATE_THRESHOLD,
+) -> tuple[list[RssPostHistory], int]:
+    """折叠列表内的近似重复帖子，只保留每组中排在最前面的一个；候选对只来自同一个LSH桶"""
+    signature_map = await get_signature_map(posts)
+    bucket_map: dict[str, list[int]] = {}
+    collapsed = set()
+    for i, post in enumerate(posts):
+        signature = signature_map[post.post_id]
+        candidates = set()
+        for bucket in get_buckets(signature):
+            candidates.update(bucket_map.setdefault(bucket, []))
+            bucket_map[bucket].append(i)
+        if any(
+            j not in collapsed and get_similarity(signature, signature_map[posts[j].post_id]) >= threshold
+            for j in candidates
+        ):
+            collapsed.add(i)
+    return [post for i, post in enumerate(posts) if i not in collapsed], len(collapsed)
@@ -6,21 +6,32 @@ from __future__ import annotations
 import asyncio
 import os
 
+import sqlalchemy as sa
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from nodeseekmcp.models import RssPostHistory
+from nodeseekmcp.models import RssPostSignature
+from nodeseekmcp.models import RssPostSignatureBucket
+from nodeseekmcp.models import WatchlistMatch
 from nodeseekmcp.models import create_session
 from nodeseekmcp.models import create_tables
 from nodeseekmcp.models import upsert
 from nodeseekmcp.nodeseek import NodeSeekClient
+from nodeseekmcp.similarity import get_buckets
+from nodeseekmcp.similarity import get_signature
+from nodeseekmcp.watchlist import WatchlistMatcherCache
+
+# 常驻实例：复用连接池，并保存每个RSS源的条件请求状态（ETag/Last-Modified）
+nodeseek_client = NodeSeekClient.from_env()
+
+watchlist_matcher_cache = WatchlistMatcherCache()
 
 
 async def sync_rss_post_history():
     print('sync_rss_post_history start...', flush=True)
 
-    client = NodeSeekClient()
-    rss_posts = client.get_rss_posts()
-    print(f'{len(rss_posts)=}', flush=True)
+    rss_posts = await nodeseek_client.get_rss_posts_from_feeds()
+    print(f'{len(nodeseek_client.rss_urls)=}, {len(rss_posts)=}', flush=True)
 
     post_data_list = []
     for rss_post in rss_posts:
@@ -37,10 +48,88 @@ async def sync_rss_post_history():
 
     await create_tables()
 
+    if not post_data_list:
+        print('sync_rss_post_history done, no new posts', flush=True)
+        return
+
+    try:
+        text_map = await RssPostHistory.get_text_map([rss_post.post_id for rss_post in rss_posts])
+        watchlist_matcher = await watchlist_matcher_cache.get()
+        match_data_list = []
+        new_rss_posts = []
+        changed_rss_posts = []
+        for rss_post in rss_posts:
+            if rss_post.post_id in text_map:
+                # 帖子标题或摘要被修改过时，需要重新计算签名，否则相似度判断用的还是旧内容
+                if text_map[rss_post.post_id] != (rss_post.title, rss_post.summary):
+                    changed_rss_posts.append(rss_post)
+                continue
+            new_rss_posts.append(rss_post)
+            for watchlist_id, matched_terms in watchlist_matcher.match(rss_post).items():
+                match_data = dict(
+                    watchlist_id=watchlist_id,
+                    watchlist_name=watchlist_matcher.watchlists[watchlist_id].name,
+                    post_id=rss_post.post_id,
+                    matched_terms=matched_terms,
+                )
+                match_data_list.append(match_data)
+        print(f'{len(new_rss_posts)=}, {len(changed_rss_posts)=}, {len(match_data_list)=}', flush=True)
+
+        # 在开启写事务之前算好签名，避免计算期间一直占着SQLite的写锁
+        signature_data = await build_rss_post_signature_data_in_thread(new_rss_posts + changed_rss_posts)
+        async with create_session() as session:
+            await session.execute(upsert(RssPostHistory), post_data_list)
+            await save_rss_post_signatures(*signature_data, session)
+            if match_data_list:
+                await session.execute(sa.insert(WatchlistMatch), match_data_list)
+            await session.commit()
+    except Exception:
+        nodeseek_client.reset_rss_feed_states()
+        raise
+    print('sync_rss_post_history done', flush=True)
+
+
+def build_rss_post_signature_data(rss_posts) -> tuple[list[dict], list[dict]]:
+    signature_data_list = []
+    bucket_data_list = []
+    for rss_post in rss_posts:
+        signature = get_signature(rss_post.title, rss_post.summary)
+        signature_data_list.append(dict(post_id=rss_post.post_id, signature=signature))
+        for bucket in get_buckets(signature):
+            bucket_data_list.append(dict(bucket=bucket, post_id=rss_post.post_id))
+    return signature_data_list, bucket_data_list
+
+
+async def build_rss_post_signature_data_in_thread(rss_posts) -> tuple[list[dict], list[dict]]:
+    # MinHash计算是纯CPU操作，放到线程里避免阻塞其他定时任务
+    if not rss_posts:
+        return [], []
+    return await asyncio.to_thread(build_rss_post_signature_data, rss_posts)
+
+
+async def save_rss_post_signatures(signature_data_list: list[dict], bucket_data_list: list[dict], session):
+    if not signature_data_list:
+        return
+    # 重新签名的帖子先删掉旧的LSH桶，否则旧内容的桶会一直留在候选集里
+    post_ids = [signature_data['post_id'] for signature_data in signature_data_list]
+    await session.execute(sa.delete(RssPostSignatureBucket).where(RssPostSignatureBucket.post_id.in_(post_ids)))
+    await session.execute(upsert(RssPostSignature), signature_data_list)
+    await session.execute(upsert(RssPostSignatureBucket), bucket_data_list)
+
+
+async def backfill_rss_post_signatures():
+    # 为相似帖子索引上线前已入库的帖子补算签名，每次只处理一批
+    await create_tables()
+
+    rss_posts = await RssPostHistory.get_list_without_signature(limit=200)
+    if not rss_posts:
+        return
+
+    signature_data = await build_rss_post_signature_data_in_thread(rss_posts)
     async with create_session() as session:
-        await session.execute(upsert(RssPostHistory), post_data_list)
+        await save_rss_post_signatures(*signature_data, session)
         await session.commit()
-        print('sync_rss_post_history done', flush=True)
+    print(f'backfill_rss_post_signatures done, {len(rss_posts)=}', flush=True)
 
 
 async def main():
@@ -48,11 +137,18 @@ async def main():
 
     scheduler.add_job(sync_rss_post_history, 'interval', seconds=10, kwargs={})
 
+    scheduler.add_job(backfill_rss_post_signatures, 'interval', seconds=60, kwargs={})
+
     scheduler.start()
 
     print('Press Ctrl+{} to exit'.format('Break' if os.name == 'nt' else 'C'), flush=True)
-    while True:
-        await asyncio.sleep(9.876543210)
+    try:
+        while True:
+            await asyncio.sleep(9.876543210)
+    finally:
+        # Ctrl+C时asyncio.run会取消main，这里停止调度并关闭RSS连接池
+        scheduler.shutdown(wait=False)
+        await nodeseek_client.aclose()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nodeseekmcp.models import Watchlist
+from nodeseekmcp.nodeseek import TAG_ZH_MAP
+from nodeseekmcp.nodeseek import RssPost
+
+
+def normalize_keyword(keyword: str) -> str:
+    return keyword.strip().lower()
+
+
+def normalize_tag(tag: str) -> str:
+    tag = tag.strip()
+    return TAG_ZH_MAP.get(tag.lower(), tag)
+
+
+def normalize_author(author: str) -> str:
+    return author.strip().lower()
+
+
+def split_terms(terms: str | Iterable[str], normalize) -> list[str]:
+    if isinstance(terms, str):
+        terms = terms.split(',')
+    return sorted({normalize(term) for term in terms if normalize(term)})
+
+
+class AhoCorasick:
+    """多模式子串匹配自动机，一次扫描文本即可找出所有命中的模式，耗时与模式数量无关"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[str | None] = [None]
+        # 沿fail链最近的一个有输出的节点，避免匹配时逐个回溯fail链
+        self.output_link: list[int] = [0]
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.output_link.append(0)
+            node = next_node
+        self.output[node] = pattern
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self.goto[node].items():
+                queue.append(next_node)
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                fail = self.goto[fail].get(char, 0)
+                self.fail[next_node] = fail
+                self.output_link[next_node] = fail if self.output[fail] is not None else self.output_link[fail]
+
+    def search(self, text: str) -> set[str]:
+        goto, fail, output, output_link = self.goto, self.fail, self.output, self.output_link
+        matched = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            hit = node if output[node] is not None else output_link[node]
+            while hit:
+                matched.add(output[hit])
+                hit = output_link[hit]
+        return matched
+
+
+class WatchlistMatcher:
+    """把所有监控列表编译成一个自动机加若干倒排索引，单个帖子只需扫描一次"""
+
+    def __init__(self, watchlists: Iterable[Watchlist]):
+        self.watchlists: dict[uuid.UUID, Watchlist] = {}
+        self.keyword_index: dict[str, set[uuid.UUID]] = {}
+        self.tag_index: dict[str, set[uuid.UUID]] = {}
+        self.author_index: dict[str, set[uuid.UUID]] = {}
+
+        for watchlist in watchlists:
+            self.watchlists[watchlist.id] = watchlist
+            for keyword in watchlist.keywords:
+                self.keyword_index.setdefault(keyword, set()).add(watchlist.id)
+            # 没有关键词的监控列表只能通过标签或作者召回
+            if not watchlist.keywords:
+                for tag in watchlist.tags:
+                    self.tag_index.setdefault(tag, set()).add(watchlist.id)
+                if not watchlist.tags:
+                    for author in watchlist.authors:
+                        self.author_index.setdefault(author, set()).add(watchlist.id)
+
+        self.automaton = AhoCorasick(self.keyword_index)
+
+    def match(self, rss_post: RssPost) -> dict[uuid.UUID, list[str]]:
+        post_tags = {normalize_tag(tag) for tag in rss_post.tag.split(',') if tag.strip()}
+        post_author = normalize_author(rss_post.author)
+
+        keyword_hits: dict[uuid.UUID, list[str]] = {}
+        for keyword in self.automaton.search(f'{rss_post.title}\n{rss_post.summary}'.lower()):
+            for watchlist_id in self.keyword_index[keyword]:
+                keyword_hits.setdefault(watchlist_id, []).append(keyword)
+
+        candidates = set(keyword_hits)
+        for tag in post_tags:
+            candidates.update(self.tag_index.get(tag, ()))
+        candidates.update(self.author_index.get(post_author, ()))
+
+        matches = {}
+        for watchlist_id in candidates:
+            watchlist = self.watchlists[watchlist_id]
+            matched_tags = post_tags.intersection(watchlist.tags)
+            if watchlist.tags and not matched_tags:
+                continue
+            if watchlist.authors and post_author not in watchlist.authors:
+                continue
+            matched_terms = sorted(keyword_hits.get(watchlist_id, [])) + sorted(matched_tags)
+            if watchlist.authors:
+                matched_terms.append(post_author)
+            matches[watchlist_id] = matched_terms
+        return matches
+
+
+class WatchlistMatcherCache:
+    """只在监控列表发生变化时重建匹配器"""
+
+    def __init__(self):
+        self.version: tuple[int, datetime | None] | None = None
+        self.matcher: WatchlistMatcher | None = None
+
+    async def get(self, session: AsyncSession = None) -> WatchlistMatcher:
+        version = await Watchlist.get_version(session=session)
+        if self.matcher is None or version != self.version:
+            watchlists = await Watchlist.get_list(session=session)
+            self.matcher = WatchlistMatcher(watchlists)
+            self.version = version
+        return self.matcher
@@ -0,0 +1,122 @@
+import gzip
+import json
+import random
+import timeit
+from types import SimpleNamespace
+
+import brotli
+import pendulum
+from pydantic import Field
+from pydantic import TypeAdapter
+
+from nodeseekmcp.mcp_server import BaseResponse
+from nodeseekmcp.mcp_server import GetRssPostHistoryResponse
+from nodeseekmcp.mcp_server import build_rss_post_history_response
+from nodeseekmcp.mcp_server import parse_fields
+from nodeseekmcp.nodeseek import RssPost
+
+PAGE_SIZE = 100
+
+ROUNDS = 50
+
+# 取多轮中最快的一轮，减少机器负载带来的抖动
+REPEATS = 15
+
+
+class LegacyGetRssPostHistoryResponse(BaseResponse):
+    rss_posts: list[RssPost] = Field(default_factory=list)
+    total_count: int = Field(default=0)
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    # 随机常用汉字+ASCII，避免重复文本让压缩率虚高
+    return ''.join(
+        chr(rng.randint(0x4E00, 0x62FF)) if rng.random() < 0.7 else rng.choice('abcdefghijklmnopqrstuvwxyz0123456789 ')
+        for _ in range(length)
+    )
+
+
+def make_posts():
+    rng = random.Random(0)
+    now = pendulum.now('UTC')
+    return [
+        SimpleNamespace(
+            post_id=str(419416 + i),
+            url=f'https://www.nodeseek.com/post-{419416 + i}-1',
+            author=f'user{i}',
+            title=random_text(rng, rng.randint(10, 40)),
+            tag=rng.choice(['交易', '技术', '日常', '情报', '推广']),
+            summary=random_text(rng, rng.randint(100, 400)),
+            published_at=now.subtract(minutes=i),
+        )
+        for i in range(PAGE_SIZE)
+    ]
+
+
+def build_legacy(posts):
+    return LegacyGetRssPostHistoryResponse(
+        rss_posts=[
+            RssPost(
+                post_id=post.post_id,
+                url=post.url,
+                author=post.author,
+                title=post.title,
+                tag=post.tag,
+                summary=post.summary,
+                published_at=post.published_at,
+            )
+            for post in posts
+        ],
+        total_count=len(posts),
+    )
+
+
+def build(posts, fields='', summary_max_chars=0, compact=False):
+    # 与get_nodeseek_or_ns_rss_feed_posts共用同一套字段解析和响应构建逻辑
+    return build_rss_post_history_response(
+        posts,
+        len(posts),
+        parse_fields(fields),
+        summary_max_chars=summary_max_chars,
+        compact=compact,
+    )
+
+
+def measure(name, response_type, build_response):
+    # 和FastMCP一致：先dump成jsonable结构（structured_content），再序列化成文本（TextContent）
+    adapter = TypeAdapter(response_type)
+
+    def run():
+        structured = adapter.dump_python(build_response(), mode='json')
+        return json.dumps(structured, ensure_ascii=False).encode()
+
+    body = run()
+    elapsed_ms = min(timeit.repeat(run, number=ROUNDS, repeat=REPEATS)) / ROUNDS * 1000
+    print(
+        f'{name:<32} {len(body):>8} {len(gzip.compress(body, compresslevel=6)):>8} '
+        f'{len(brotli.compress(body, mode=brotli.MODE_TEXT, quality=5)):>8} {elapsed_ms:>8.3f}'
+    )
+
+
+def main():
+    posts = make_posts()
+    print(f'{"mode":<32} {"raw(B)":>8} {"gzip(B)":>8} {"br(B)":>8} {"ms":>8}')
+    measure('legacy', LegacyGetRssPostHistoryResponse, lambda: build_legacy(posts))
+    measure('all fields', GetRssPostHistoryResponse, lambda: build(posts))
+    measure('summary_max_chars=80', GetRssPostHistoryResponse, lambda: build(posts, summary_max_chars=80))
+    measure('fields=post_id,title,url', GetRssPostHistoryResponse, lambda: build(posts, fields='post_id,title,url'))
+    measure('compact, all fields', GetRssPostHistoryResponse, lambda: build(posts, compact=True))
+    measure(
+        'compact, summary_max_chars=80',
+        GetRssPostHistoryResponse,
+        lambda: build(posts, summary_max_chars=80, compact=True),
+    )
+    measure(
+        'compact, fields=post_id,title,url',
+        GetRssPostHistoryResponse,
+        lambda: build(posts, fields='post_id,title,url', compact=True),
+    )
+
+
+if __name__ == '__main__':
+    main()